@@ -76,6 +76,15 @@ def init_db():
               notes TEXT,
               created_at TIMESTAMP NOT NULL
             );"""))
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS coach_athletes (
+              coach_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+              athlete_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+              status TEXT NOT NULL DEFAULT 'pending',
+              PRIMARY KEY (coach_id, athlete_id)
+            );"""))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_workouts_user_wdate ON workouts (user_id, wdate);"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_plans_user ON plans (user_id);"))
     else:
         conn = get_conn(); cur = conn.cursor()
         cur.execute("""
@@ -118,6 +127,17 @@ def init_db():
           created_at TEXT NOT NULL,
           FOREIGN KEY(user_id) REFERENCES users(id)
         );""")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS coach_athletes (
+          coach_id INTEGER NOT NULL,
+          athlete_id INTEGER NOT NULL,
+          status TEXT NOT NULL DEFAULT 'pending',
+          PRIMARY KEY (coach_id, athlete_id),
+          FOREIGN KEY(coach_id) REFERENCES users(id),
+          FOREIGN KEY(athlete_id) REFERENCES users(id)
+        );""")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_workouts_user_wdate ON workouts (user_id, wdate);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_plans_user ON plans (user_id);")
         conn.commit()
 
 # helpers
@@ -267,6 +287,111 @@ def get_workouts(user_id, start=None, end=None):
         if end: q+=" AND date(wdate) <= date(?)"; params.append(end.isoformat())
         q+=" ORDER BY wdate DESC"
         return pd.read_sql_query(q, conn, params=params, parse_dates=["wdate"])
+
+# COACH / EQUIPO
+# Roles por variable de entorno (emails separados por comas).
+# Coaches: pueden invitar atletas. Admins: además ven a todos los usuarios.
+def _email_set(var):
+    return {e.strip().lower() for e in os.getenv(var, "").split(",") if e.strip()}
+
+ADMIN_EMAILS = _email_set("ATHLETON_ADMIN_EMAILS")
+COACH_EMAILS = _email_set("ATHLETON_COACH_EMAILS") | ADMIN_EMAILS
+
+def is_admin(user):
+    return (user.get("email") or "").lower() in ADMIN_EMAILS
+
+def is_coach(user):
+    return (user.get("email") or "").lower() in COACH_EMAILS
+
+# El vínculo nace 'pending'; solo cuenta para el coach cuando el atleta lo acepta.
+def invite_athlete(coach, athlete_id):
+    if not is_coach(coach):
+        raise PermissionError("Solo los coaches pueden invitar atletas.")
+    if USE_PG:
+        execute("INSERT INTO coach_athletes (coach_id,athlete_id) VALUES (:c,:a) ON CONFLICT DO NOTHING", {"c": coach["id"], "a": athlete_id})
+    else:
+        execute("INSERT OR IGNORE INTO coach_athletes (coach_id,athlete_id) VALUES (?,?)", (coach["id"], athlete_id))
+
+def accept_invite(athlete_id, coach_id):
+    if USE_PG:
+        execute("UPDATE coach_athletes SET status='accepted' WHERE coach_id=:c AND athlete_id=:a", {"c": coach_id, "a": athlete_id})
+    else:
+        execute("UPDATE coach_athletes SET status='accepted' WHERE coach_id=? AND athlete_id=?", (coach_id, athlete_id))
+    get_squad_summary.clear()
+
+def unlink_athlete(coach_id, athlete_id):
+    if USE_PG:
+        execute("DELETE FROM coach_athletes WHERE coach_id=:c AND athlete_id=:a", {"c": coach_id, "a": athlete_id})
+    else:
+        execute("DELETE FROM coach_athletes WHERE coach_id=? AND athlete_id=?", (coach_id, athlete_id))
+    get_squad_summary.clear()
+
+def get_coach_links(athlete_id):
+    """Coaches vinculados al atleta (pendientes y aceptados)."""
+    if USE_PG:
+        return fetchall("SELECT u.id, COALESCE(u.name, u.email) AS name, ca.status FROM coach_athletes ca JOIN users u ON u.id=ca.coach_id WHERE ca.athlete_id=:a ORDER BY name", {"a": athlete_id})
+    return fetchall("SELECT u.id, COALESCE(u.name, u.email) AS name, ca.status FROM coach_athletes ca JOIN users u ON u.id=ca.coach_id WHERE ca.athlete_id=? ORDER BY name", (athlete_id,))
+
+# Una sola consulta agregada para todo el equipo (nada de N llamadas a get_workouts).
+# Ambos motores aceptan parámetros :nombre; solo cambia la expresión del día de la semana.
+WEEKDAY_SQL = "(EXTRACT(ISODOW FROM d.wdate)::int - 1)" if USE_PG else "((CAST(strftime('%w', d.wdate) AS INTEGER) + 6) % 7)"
+
+SQUAD_SUMMARY_SQL = """
+SELECT u.id AS user_id, COALESCE(u.name, u.email) AS athlete, u.email,
+  COALESCE(w.minutes, 0) / :weeks AS min_week,
+  COALESCE(w.km, 0) / :weeks AS km_week,
+  COALESCE(w.sessions, 0) / :weeks AS sessions_week,
+  COALESCE(p.planned, 0) AS planned_week,
+  CASE WHEN COALESCE(p.planned, 0) = 0 THEN NULL
+       ELSE COALESCE(h.hit_days, 0) * 100.0 / (p.planned * :weeks) END AS compliance,
+  (SELECT MAX(x.wdate) FROM workouts x WHERE x.user_id = u.id) AS last_wdate
+FROM users u
+LEFT JOIN (
+  SELECT user_id, SUM(duration_min) AS minutes, SUM(distance_km) AS km, COUNT(*) AS sessions
+  FROM workouts
+  WHERE user_id IN ({scope}) AND wdate >= :s AND wdate <= :e
+  GROUP BY user_id
+) w ON w.user_id = u.id
+LEFT JOIN (
+  SELECT user_id, COUNT(DISTINCT weekday) AS planned
+  FROM plans
+  WHERE user_id IN ({scope}) AND title NOT LIKE :rest
+  GROUP BY user_id
+) p ON p.user_id = u.id
+LEFT JOIN (
+  SELECT d.user_id, COUNT(*) AS hit_days
+  FROM (SELECT DISTINCT user_id, wdate FROM workouts
+        WHERE user_id IN ({scope}) AND wdate >= :s AND wdate <= :e) d
+  JOIN (SELECT DISTINCT user_id, weekday FROM plans
+        WHERE user_id IN ({scope}) AND title NOT LIKE :rest) pw
+    ON pw.user_id = d.user_id AND pw.weekday = {weekday}
+  GROUP BY d.user_id
+) h ON h.user_id = u.id
+WHERE u.id IN ({scope})
+ORDER BY athlete
+"""
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_squad_summary(coach_id=None, weeks=4, end=None):
+    """Resumen por atleta de las últimas `weeks` semanas; coach_id=None → todos (admin).
+
+    Cumplimiento (%) = días entrenados que caen en un día no-descanso del plan
+    / (días planificados × semanas). Sesiones extra en días libres no suman,
+    así que nunca pasa de 100. Cacheado 60 s por (coach_id, weeks, end).
+    """
+    end = end or date.today()
+    start = end - timedelta(days=7*weeks - 1)
+    if coach_id is None:
+        scope = "SELECT id FROM users"
+    else:
+        scope = "SELECT athlete_id FROM coach_athletes WHERE coach_id = :c AND status = 'accepted'"
+    query = SQUAD_SUMMARY_SQL.format(scope=scope, weekday=WEEKDAY_SQL)
+    params = {"weeks": float(weeks), "s": start.isoformat(), "e": end.isoformat(), "rest": "Descanso%"}
+    if coach_id is not None:
+        params["c"] = coach_id
+    if USE_PG:
+        return pd.read_sql(text(query), engine, params=params, parse_dates=["last_wdate"])
+    return pd.read_sql_query(query, get_conn(), params=params, parse_dates=["last_wdate"])
 # ---------------------- fin DB ----------------------
 
 import hashlib
@@ -615,6 +740,72 @@ def insights_view(user_id):
     else:
         st.caption("IA no configurada (añade OPENAI_API_KEY).")
 
+def squad_view(user):
+    st.subheader("Equipo")
+    if not is_coach(user): st.info("Solo disponible para coaches."); return
+    admin = is_admin(user)
+    with st.form("add_athlete", clear_on_submit=True):
+        col1, col2 = st.columns([3,1])
+        with col1: email = st.text_input("Email del atleta")
+        with col2: add = st.form_submit_button("Invitar", use_container_width=True)
+    if add and email.strip():
+        a = get_user_by_email(email.strip())
+        if not a: st.error("No existe ningún usuario con ese email.")
+        else: invite_athlete(user, a["id"]); st.success("Invitación enviada. Verás sus datos cuando la acepte.")
+
+    col1, col2, col3 = st.columns(3)
+    with col1: weeks = st.slider("Semanas", 1, 12, 4)
+    with col2: search = st.text_input("Buscar atleta")
+    with col3: show_all = admin and st.toggle("Ver todos (admin)")
+    df = get_squad_summary(None if show_all else user["id"], weeks, date.today())
+    if df.empty: st.info("Aún no tienes atletas en tu equipo."); return
+
+    today = pd.Timestamp(date.today())
+    df["days_since"] = (today - df["last_wdate"]).dt.days
+    col1, col2, col3 = st.columns(3)
+    with col1: st.metric("Atletas", len(df))
+    with col2: st.metric("Sin actividad (>7 días)", int((df["days_since"].isna() | (df["days_since"] > 7)).sum()))
+    with col3: st.metric("Cumplimiento medio", f"{df['compliance'].mean():.0f}%" if df["compliance"].notna().any() else "—")
+
+    if search.strip():
+        s = search.strip().lower()
+        df = df[df["athlete"].str.lower().str.contains(s, regex=False) | df["email"].str.lower().str.contains(s, regex=False)].copy()
+    st.dataframe(
+        df[["athlete","email","min_week","km_week","sessions_week","planned_week","compliance","last_wdate","days_since"]],
+        hide_index=True, use_container_width=True,
+        column_config={
+            "athlete": "Atleta", "email": "Email",
+            "min_week": st.column_config.NumberColumn("Min/semana", format="%.0f"),
+            "km_week": st.column_config.NumberColumn("Km/semana", format="%.1f"),
+            "sessions_week": st.column_config.NumberColumn("Sesiones/semana", format="%.1f"),
+            "planned_week": st.column_config.NumberColumn("Plan (días/sem)"),
+            "compliance": st.column_config.ProgressColumn("Cumplimiento", format="%.0f%%", min_value=0, max_value=100),
+            "last_wdate": st.column_config.DateColumn("Última sesión"),
+            "days_since": st.column_config.NumberColumn("Días sin entrenar"),
+        },
+    )
+
+    if not show_all:
+        with st.expander("Quitar atleta"):
+            opts = dict(zip(df["athlete"] + " (" + df["email"] + ")", df["user_id"]))
+            sel = st.selectbox("Atleta", list(opts))
+            if sel and st.button("Quitar del equipo"):
+                unlink_athlete(user["id"], int(opts[sel])); st.rerun()
+
+def coach_invites_view(user_id):
+    links = get_coach_links(user_id)
+    if not links: return
+    st.markdown("### Coaches")
+    for l in links:
+        col1, col2, col3 = st.columns([3,1,1])
+        with col1: st.write(f"**{l['name']}** — {'pendiente' if l['status']=='pending' else 'puede ver tu resumen semanal'}")
+        if l["status"] == "pending":
+            with col2:
+                if st.button("Aceptar", key=f"accept_{l['id']}"): accept_invite(user_id, l["id"]); st.rerun()
+        with col3:
+            if st.button("Rechazar" if l["status"] == "pending" else "Revocar", key=f"unlink_{l['id']}"):
+                unlink_athlete(l["id"], user_id); st.rerun()
+
 # ---------------------- App ----------------------
 def main():
     st.set_page_config(page_title="AthletON", page_icon="🏃", layout="wide")
@@ -636,11 +827,12 @@ def main():
     if needs_onboarding(user["id"]): onboarding_view(user["id"]); return
 
     st.title("Panel AthletON")
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Plan","Registrar","Historial","Perfil","Coach IA"])
+    tabs = st.tabs(["Plan","Registrar","Historial","Perfil","Coach IA"] + (["Equipo"] if is_coach(user) else []))
+    tab1, tab2, tab3, tab4, tab5 = tabs[:5]
     with tab1: weekly_plan_view(user_id=user["id"])
     with tab2: log_workout_view(user_id=user["id"])
     with tab3: history_view(user_id=user["id"]); st.divider(); insights_view(user_id=user["id"])
-    with tab4: profile_view(user_id=user["id"])
+    with tab4: profile_view(user_id=user["id"]); coach_invites_view(user_id=user["id"])
     with tab5:
         st.subheader("Coach IA personalizado")
         st.caption("Usa tu perfil e historial. (Configura OPENAI_API_KEY)")
@@ -649,6 +841,8 @@ def main():
             prof = dict(get_profile(user["id"]) or {})
             df_last = get_workouts(user["id"], date.today()-timedelta(days=60), date.today())
             st.write(ai_coach_response(q, prof, df_last))
+    if len(tabs) > 5:
+        with tabs[5]: squad_view(user)
 
 if __name__ == "__main__":
     main()